@@ -1,20 +1,32 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from pydantic import BaseModel, Field
 from lob_app import generate_lob_summary
 from lob_app.csv_parser import CSVParser
+import orjson
 import os
-from typing import Dict, Any, List
+import shutil
+from functools import lru_cache
+from typing import Dict, Any
 
 
-app = FastAPI(title="LOB Summary Generator", version="1.0.0")
+app = FastAPI(title="LOB Summary Generator", version="1.0.0", default_response_class=ORJSONResponse)
 
 # Mount static files using an absolute path so it works on serverless
 _BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 _STATIC_DIR = os.path.join(_BASE_DIR, "static")
 app.mount("/static", StaticFiles(directory=_STATIC_DIR), name="static")
 
+# Read the landing page once at import instead of on every request
+def _read_index() -> bytes:
+    with open(os.path.join(_STATIC_DIR, "index.html"), "rb") as f:
+        return f.read()
+
+
+_INDEX_HTML = _read_index()
+
 # Initialize CSV parser (env override supported) with robust path resolution
 def _resolve_csv_path(path: str) -> str:
     # If absolute and exists, return
@@ -35,14 +47,22 @@ csv_file_path = _resolve_csv_path(os.getenv(
 ))
 csv_parser = CSVParser(csv_file_path)
 
+# Serialized JSON for read-only endpoints, tagged with the KB version they were built from
+_kb_version: int = 1
+_issue_types_cache: tuple[int, bytes] = (0, b"")
+_csv_info_cache: tuple[int, bytes] = (0, b"")
+
 
 def reload_csv_parser(new_csv_path: str) -> None:
     """Reload the global CSV parser with a new CSV file path."""
-    global csv_parser, csv_file_path
+    global csv_parser, csv_file_path, _kb_version
     if not os.path.exists(new_csv_path):
         raise FileNotFoundError(f"CSV file not found at path: {new_csv_path}")
     csv_file_path = new_csv_path
     csv_parser = CSVParser(csv_file_path)
+    _kb_version += 1
+    # Entries are keyed by version; clearing just releases the old parser sooner
+    _csv_validation_cached.cache_clear()
 
 
 class GenerateRequest(BaseModel):
@@ -59,28 +79,27 @@ class GenerateResponse(BaseModel):
     csv_validation: Dict[str, Any] | None = None
 
 
-class IssueTypesResponse(BaseModel):
-    issue_types: List[str]
-    knowledge_base: Dict[str, Any]
-
-
 @app.get("/", response_class=HTMLResponse)
 async def read_root():
     """Serve the main HTML page."""
-    with open("static/index.html", "r", encoding="utf-8") as f:
-        return HTMLResponse(content=f.read())
+    return HTMLResponse(content=_INDEX_HTML)
 
 
-@app.get("/api/issue-types", response_model=IssueTypesResponse)
+@app.get("/api/issue-types")
 def get_issue_types():
     """Get all available issue types from CSV knowledge base."""
+    global _issue_types_cache
     try:
-        issue_types = csv_parser.get_issue_types()
-        knowledge_base = csv_parser.knowledge_base
-        return IssueTypesResponse(
-            issue_types=issue_types,
-            knowledge_base=knowledge_base
-        )
+        # Capture the version before reading the parser; reload bumps it after the swap
+        version = _kb_version
+        cached = _issue_types_cache
+        if cached[0] != version:
+            payload = {
+                "issue_types": csv_parser.get_issue_types(),
+                "knowledge_base": csv_parser.knowledge_base,
+            }
+            cached = _issue_types_cache = (version, orjson.dumps(payload))
+        return Response(content=cached[1], media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading CSV data: {str(e)}")
 
@@ -111,34 +130,44 @@ def generate(req: GenerateRequest) -> GenerateResponse:
 
 def get_csv_validation(issue_type: str, voc: str, tier: str | None = None) -> Dict[str, Any]:
     """Get CSV-based validation and suggestions."""
-    validation = {}
-    
+    # Read the version before the parser: a reload swaps the parser first and
+    # bumps the version after, so a result is never filed under a newer version.
+    version = _kb_version
+    parser = csv_parser
     try:
-        # Find best matching issue type
-        best_match = csv_parser.find_best_match(f"{issue_type} {voc}")
-        if best_match:
-            validation["matched_issue_type"] = best_match
-            
-            # Get resolution for the matched issue type
-            tier_key = _map_tier_to_key(tier or "Gold")
-            resolution = csv_parser.get_resolution(best_match, tier_key)
-            validation["suggested_resolution"] = resolution
-            
-            # Get SOP details
-            sop_details = csv_parser.get_sop_details(best_match)
-            validation["sop_details"] = sop_details
-            
-            # Get VOC examples
-            voc_examples = csv_parser.get_voc_examples(best_match)
-            validation["voc_examples"] = voc_examples[:3]  # Limit to 3 examples
-        
-        return validation
-        
+        # Copy so callers can't mutate the cached entry
+        return dict(_csv_validation_cached(version, parser, issue_type, voc, tier))
     except Exception as e:
+        # Not cached, so a transient failure is retried on the next call
         print(f"Error in CSV validation: {e}")
         return {}
 
 
+@lru_cache(maxsize=2048)
+def _csv_validation_cached(version: int, parser: CSVParser, issue_type: str, voc: str, tier: str | None) -> Dict[str, Any]:
+    validation = {}
+    
+    # Find best matching issue type
+    best_match = parser.find_best_match(f"{issue_type} {voc}")
+    if best_match:
+        validation["matched_issue_type"] = best_match
+        
+        # Get resolution for the matched issue type
+        tier_key = _map_tier_to_key(tier or "Gold")
+        resolution = parser.get_resolution(best_match, tier_key)
+        validation["suggested_resolution"] = resolution
+        
+        # Get SOP details
+        sop_details = parser.get_sop_details(best_match)
+        validation["sop_details"] = sop_details
+        
+        # Get VOC examples
+        voc_examples = parser.get_voc_examples(best_match)
+        validation["voc_examples"] = tuple(voc_examples[:3])  # Limit to 3 examples
+    
+    return validation
+
+
 def _normalize_yes_no(value: str | bool | None) -> str:
     if isinstance(value, bool):
         return "Yes" if value else "No"
@@ -223,16 +252,23 @@ def _map_tier_to_key(tier_label: str) -> str:
 @app.get("/api/csv-info")
 def get_csv_info():
     """Get information about the CSV knowledge base."""
+    global _csv_info_cache
     try:
-        issue_types = csv_parser.get_issue_types()
-        total_issues = len(issue_types)
-        
-        return {
-            "total_issue_types": total_issues,
-            "csv_file": csv_file_path,
-            "issue_types": issue_types,
-            "status": "loaded"
-        }
+        # Capture the version before reading the parser; reload bumps it after the swap
+        version = _kb_version
+        cached = _csv_info_cache
+        if cached[0] != version:
+            issue_types = csv_parser.get_issue_types()
+            total_issues = len(issue_types)
+            
+            payload = {
+                "total_issue_types": total_issues,
+                "csv_file": csv_file_path,
+                "issue_types": issue_types,
+                "status": "loaded"
+            }
+            cached = _csv_info_cache = (version, orjson.dumps(payload))
+        return Response(content=cached[1], media_type="application/json")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting CSV info: {str(e)}")
 
@@ -253,13 +289,15 @@ async def upload_csv(file: UploadFile = File(...)):
         os.makedirs(uploads_dir, exist_ok=True)
         destination_path = os.path.join(uploads_dir, file.filename)
 
-        # Save file to disk
-        content = await file.read()
-        with open(destination_path, "wb") as f:
-            f.write(content)
+        # Copy the spooled upload to disk in 64KB chunks off the event loop
+        def _save() -> None:
+            with open(destination_path, "wb") as out:
+                shutil.copyfileobj(file.file, out, 1024 * 64)
+
+        await run_in_threadpool(_save)
 
-        # Reload parser
-        reload_csv_parser(destination_path)
+        # Reload parser off the event loop; re-parsing the CSV is CPU-bound
+        await run_in_threadpool(reload_csv_parser, destination_path)
 
         issue_types = csv_parser.get_issue_types()
         return {
@@ -297,7 +335,7 @@ def validate_issue_type(issue_type: str):
 
 
 # Duplicate routes without "/api" prefix for Vercel serverless compatibility
-@app.get("/issue-types", response_model=IssueTypesResponse)
+@app.get("/issue-types")
 def get_issue_types_plain():
     return get_issue_types()
 
@@ -1,38 +1,110 @@
 from __future__ import annotations
 
-import pandas as pd
-from typing import Dict, List, Optional, Any
+import csv
+from collections import defaultdict
+from typing import Dict, List, Optional, Any, Tuple
 import re
 
+import ahocorasick
+from rapidfuzz import fuzz, process, utils
+
+
+# Direct keyword -> issue type pairs; earlier entries take precedence
+_KEYWORD_MAP: Tuple[Tuple[str, str], ...] = (
+    ('mistake', 'Ordered by Mistake'),
+    ('accidentally', 'Ordered by Mistake'),
+    ('wrong product', 'Ordered by Mistake'),
+    ('size', 'Expectation Mismatch'),
+    ('color', 'Expectation Mismatch'),
+    ('quality', 'Expectation Mismatch'),
+    ('defective', 'The item(s) are defective'),
+    ('damaged', 'The item(s) are physically damaged'),
+    ('missing', 'The item(s) are missing'),
+    ('empty box', 'Empty Box received'),
+    ('wrong item', 'Wrong Item'),
+    ('pdp', 'PDP Issues'),
+)
+
+
+# Common issue types to look for in the Nodes column
+_ISSUE_TYPES: Tuple[str, ...] = (
+    'Expectation Mismatch',
+    'Ordered by Mistake',
+    'Wrong Item',
+    'PDP Issues',
+    'Compatibility Issues',
+    'Part(s) Missing',
+    'Empty Box received',
+    'Different item received',
+    'The item(s) are defective',
+    'The item(s) are physically damaged',
+    'The item(s) are not packed or sealed properly',
+    'The item(s) are missing',
+)
+
+
+def _build_automaton(pairs) -> ahocorasick.Automaton:
+    """Compile (needle, label) pairs into a single Aho-Corasick automaton.
+
+    Each needle's payload is ``(priority, label)`` so callers can recover
+    declaration-order precedence with ``min()`` over the hits.
+    """
+    automaton = ahocorasick.Automaton()
+    for priority, (needle, label) in enumerate(pairs):
+        automaton.add_word(needle, (priority, label))
+    automaton.make_automaton()
+    return automaton
+
+
+_AC = _build_automaton(_KEYWORD_MAP)
+_ISSUE_AC = _build_automaton((it.lower(), it) for it in _ISSUE_TYPES)
+
+_VOC_RE = re.compile(r'VOC:\s*(.*?)(?=\n\n|\n[A-Z]|$)', re.DOTALL | re.IGNORECASE)
+_WS_RE = re.compile(r'\s+')
+_SENT_RE = re.compile(r'[.!?]\s*')
+
 
 class CSVParser:
     def __init__(self, csv_file_path: str):
         self.csv_file_path = csv_file_path
         self.knowledge_base: Dict[str, Any] = {}
         self._parse_csv()
+        self._build_voc_index()
     
     def _parse_csv(self) -> None:
         """Parse the CSV file and create a structured knowledge base."""
         try:
-            # Read CSV with proper handling of multiline content
-            df = pd.read_csv(self.csv_file_path, encoding='utf-8')
-            
-            # Clean column names
-            df.columns = df.columns.str.strip()
-            
-            # Process each row to extract issue types and resolutions
-            for _, row in df.iterrows():
-                self._process_row(row)
+            # Stream rows; the csv module handles quoted multiline cells.
+            # utf-8-sig strips the BOM that Excel's "CSV UTF-8" export adds.
+            with open(self.csv_file_path, newline='', encoding='utf-8-sig') as fh:
+                reader = csv.DictReader(fh, restval='')
+                
+                if reader.fieldnames is None:
+                    raise ValueError("CSV file is empty")
+                
+                # Clean column names
+                reader.fieldnames = [h.strip() for h in reader.fieldnames]
+                if 'Nodes' not in reader.fieldnames:
+                    print(f"Warning: no 'Nodes' column in CSV header: {reader.fieldnames}")
+                
+                # Process each row to extract issue types and resolutions;
+                # the per-issue-type seen sets only live for the parse
+                voc_seen: Dict[str, set] = {}
+                for row in reader:
+                    self._process_row(row, voc_seen)
                 
         except Exception as e:
             print(f"Error parsing CSV: {e}")
             # Create fallback knowledge base
             self._create_fallback_kb()
+        
+        # Issue types only change on reload, which builds a new parser
+        self._issue_types_list = list(self.knowledge_base)
     
-    def _process_row(self, row: pd.Series) -> None:
+    def _process_row(self, row: Dict[str, str], voc_seen: Dict[str, set]) -> None:
         """Process a single row from the CSV."""
-        nodes = str(row.get('Nodes', '')).strip()
-        if not nodes or nodes == 'nan':
+        nodes = row.get('Nodes', '').strip()
+        if not nodes:
             return
             
         # Extract issue type from the first column
@@ -41,12 +113,12 @@ class CSVParser:
             return
             
         # Get VOC examples
-        voc_examples = self._extract_voc_examples(str(row.get('Sub-type / VOC', '')))
+        voc_examples = self._extract_voc_examples(row.get('Sub-type / VOC', ''))
         
         # Get resolutions for different tiers
-        gold_resolution = str(row.get('Gold', '')).strip()
-        silver_bronze_resolution = str(row.get('Silver & Bronze', '')).strip()
-        new_iron_resolution = str(row.get('New & Iron', '')).strip()
+        gold_resolution = row.get('Gold', '').strip()
+        silver_bronze_resolution = row.get('Silver & Bronze', '').strip()
+        new_iron_resolution = row.get('New & Iron', '').strip()
         
         # Store in knowledge base
         if issue_type not in self.knowledge_base:
@@ -60,63 +132,46 @@ class CSVParser:
                 'sop_details': nodes
             }
         
-        # Add VOC examples
-        self.knowledge_base[issue_type]['voc_examples'].extend(voc_examples)
+        # Add VOC examples, skipping ones already seen for this issue type
+        kb_entry = self.knowledge_base[issue_type]
+        seen = voc_seen.setdefault(issue_type, set())
+        for voc_example in voc_examples:
+            if voc_example not in seen:
+                seen.add(voc_example)
+                kb_entry['voc_examples'].append(voc_example)
     
     def _extract_issue_type(self, nodes_text: str) -> Optional[str]:
         """Extract the main issue type from the nodes text."""
-        # Common issue types to look for
-        issue_types = [
-            'Expectation Mismatch',
-            'Ordered by Mistake',
-            'Wrong Item',
-            'PDP Issues',
-            'Compatibility Issues',
-            'Part(s) Missing',
-            'Empty Box received',
-            'Different item received',
-            'The item(s) are defective',
-            'The item(s) are physically damaged',
-            'The item(s) are not packed or sealed properly',
-            'The item(s) are missing'
-        ]
+        nodes_lower = nodes_text.lower()
         
-        for issue_type in issue_types:
-            if issue_type.lower() in nodes_text.lower():
-                return issue_type
+        # Canonical issue types, in precedence order
+        hits = [payload for _, payload in _ISSUE_AC.iter(nodes_lower)]
+        if hits:
+            return min(hits)[1]
         
         # If no specific issue type found, try to extract from the beginning
-        lines = nodes_text.split('\n')
-        if lines:
-            first_line = lines[0].strip()
-            if first_line and len(first_line) < 100:  # Reasonable length for issue type
-                return first_line
+        first_line = nodes_text.partition('\n')[0].strip()
+        if first_line and len(first_line) < 100:  # Reasonable length for issue type
+            return first_line
         
         return None
     
     def _extract_voc_examples(self, voc_text: str) -> List[str]:
         """Extract VOC examples from the text."""
-        if not voc_text or voc_text == 'nan':
+        if not voc_text:
             return []
         
         # Split by common VOC indicators
-        voc_patterns = [
-            r'VOC:\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-            r'VOC:\s*(.*?)(?=\n\n|\n[A-Z]|$)',
-        ]
-        
         examples = []
-        for pattern in voc_patterns:
-            matches = re.findall(pattern, voc_text, re.DOTALL | re.IGNORECASE)
-            for match in matches:
-                # Clean up the match
-                cleaned = re.sub(r'\s+', ' ', match.strip())
-                if cleaned and len(cleaned) > 10:  # Reasonable length
-                    examples.append(cleaned)
+        for match in _VOC_RE.findall(voc_text):
+            # Clean up the match
+            cleaned = _WS_RE.sub(' ', match.strip())
+            if cleaned and len(cleaned) > 10:  # Reasonable length
+                examples.append(cleaned)
         
         # If no patterns found, try to extract sentences
         if not examples:
-            sentences = re.split(r'[.!?]\s*', voc_text)
+            sentences = _SENT_RE.split(voc_text)
             for sentence in sentences:
                 sentence = sentence.strip()
                 if sentence and len(sentence) > 10:
@@ -155,9 +210,28 @@ class CSVParser:
             }
         }
     
+    def _build_voc_index(self) -> None:
+        """Flatten VOC examples into a single corpus for fuzzy matching."""
+        self._voc_flat: List[str] = []
+        self._voc_owner: List[str] = []
+        for issue_type, data in self.knowledge_base.items():
+            for voc_example in data.get('voc_examples', []):
+                self._voc_flat.append(voc_example)
+                self._voc_owner.append(issue_type)
+        # Normalize (lowercase, strip punctuation) once instead of per query
+        self._voc_processed: List[str] = [utils.default_process(ex) for ex in self._voc_flat]
+        # Inverted index token -> example indices for candidate retrieval
+        self._inv_index: Dict[str, List[int]] = defaultdict(list)
+        for i, voc_example in enumerate(self._voc_processed):
+            for token in set(voc_example.split()):
+                self._inv_index[token].append(i)
+    
     def get_issue_types(self) -> List[str]:
-        """Get list of all issue types."""
-        return list(self.knowledge_base.keys())
+        """Get list of all issue types.
+
+        The list is shared across calls; callers must not mutate it.
+        """
+        return self._issue_types_list
     
     def get_voc_examples(self, issue_type: str) -> List[str]:
         """Get VOC examples for a specific issue type."""
@@ -176,36 +250,31 @@ class CSVParser:
         """Find the best matching issue type based on user input."""
         user_input_lower = user_input.lower()
         
-        # Direct keyword matching
-        keyword_mapping = {
-            'mistake': 'Ordered by Mistake',
-            'accidentally': 'Ordered by Mistake',
-            'wrong product': 'Ordered by Mistake',
-            'size': 'Expectation Mismatch',
-            'color': 'Expectation Mismatch',
-            'quality': 'Expectation Mismatch',
-            'defective': 'The item(s) are defective',
-            'damaged': 'The item(s) are physically damaged',
-            'missing': 'The item(s) are missing',
-            'empty box': 'Empty Box received',
-            'wrong item': 'Wrong Item',
-            'pdp': 'PDP Issues'
-        }
-        
-        for keyword, issue_type in keyword_mapping.items():
-            if keyword in user_input_lower:
-                return issue_type
+        # Direct keyword matching in a single pass over the input
+        hits = [payload for _, payload in _AC.iter(user_input_lower)]
+        if hits:
+            return min(hits)[1]
         
-        # Fuzzy matching with VOC examples
-        best_match = None
-        best_score = 0
+        # Fuzzy matching, limited to VOC examples sharing at least one exact
+        # token with the input. token_set_ratio alone can clear the cutoff on
+        # partial words, so recall is narrower than scoring the whole corpus.
+        query = utils.default_process(user_input)
+        candidates = set()
+        for token in set(query.split()):
+            candidates.update(self._inv_index.get(token, ()))
+        if not candidates:
+            return None
         
-        for issue_type, data in self.knowledge_base.items():
-            for voc_example in data.get('voc_examples', []):
-                # Simple similarity check
-                common_words = set(user_input_lower.split()) & set(voc_example.lower().split())
-                if len(common_words) > best_score:
-                    best_score = len(common_words)
-                    best_match = issue_type
+        indices = sorted(candidates)
+        choices = [self._voc_processed[i] for i in indices]
         
-        return best_match if best_score > 0 else None
+        hit = process.extractOne(
+            query,
+            choices,
+            scorer=fuzz.token_set_ratio,
+            processor=None,
+            score_cutoff=60,
+        )
+        if not hit:
+            return None
+        return self._voc_owner[indices[hit[2]]]
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from datetime import datetime
+from functools import lru_cache
 from typing import Optional
 
+import ahocorasick
+
 
 def _normalize_yes_no(value: str | bool | None) -> str:
     if isinstance(value, bool):
@@ -13,24 +16,31 @@ def _normalize_yes_no(value: str | bool | None) -> str:
     return "Yes" if text in {"y", "yes", "true", "1"} else "No"
 
 
+_KEYWORD_CATEGORIES: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("ordered_by_mistake", ("ordered by mistake", "by mistake", "accidentally ordered", "wrong product")),
+    ("opened", ("open", "opened", "unboxed")),
+    ("pdp_mismatch", ("wrong item", "expectation mismatch", "mismatch", "different from pdp", "pdp", "product mismatch")),
+    ("defective", ("defect", "defective", "damaged", "not working", "faulty")),
+)
+
+
+def _build_keyword_automaton() -> ahocorasick.Automaton:
+    automaton = ahocorasick.Automaton()
+    for category, words in _KEYWORD_CATEGORIES:
+        for word in words:
+            automaton.add_word(word, category)
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AC = _build_keyword_automaton()
+
+
 def _detect_issue_keywords(text: str) -> set[str]:
-    lowered = text.lower()
-    keywords: set[str] = set()
-    if any(k in lowered for k in ["ordered by mistake", "by mistake", "accidentally ordered", "wrong product"]):
-        keywords.add("ordered_by_mistake")
-    if any(k in lowered for k in ["open", "opened", "unboxed"]):
-        keywords.add("opened")
-    if any(k in lowered for k in ["wrong item", "expectation mismatch", "mismatch", "different from pdp", "pdp", "product mismatch"]):
-        keywords.add("pdp_mismatch")
-    if any(k in lowered for k in ["defect", "defective", "damaged", "not working", "faulty"]):
-        keywords.add("defective")
-    return keywords
-
-
-def _choose_offered_resolution(issue_type: str, voc: str, stock_yes_no: str) -> str:
-    text = f"{issue_type} {voc}".lower()
-    keys = _detect_issue_keywords(text)
+    return {category for _, category in _KEYWORD_AC.iter(text.lower())}
+
 
+def _choose_offered_resolution(keys: set[str], stock_yes_no: str) -> str:
     if "ordered_by_mistake" in keys:
         return "Service No"
 
@@ -44,10 +54,7 @@ def _choose_offered_resolution(issue_type: str, voc: str, stock_yes_no: str) ->
     return "Service No" if stock_yes_no == "No" else "Replacement"
 
 
-def _resolution_reason(offered_resolution: str, issue_type: str, voc: str) -> str:
-    text = f"{issue_type} {voc}".lower()
-    keys = _detect_issue_keywords(text)
-
+def _resolution_reason(offered_resolution: str, keys: set[str]) -> str:
     if offered_resolution == "Service No" and "ordered_by_mistake" in keys:
         return (
             "Service No – As per SOP for accidental orders, no RPU is initiated for "
@@ -77,12 +84,28 @@ def _resolution_reason(offered_resolution: str, issue_type: str, voc: str) -> st
     return f"{offered_resolution} – Applied per SOP."
 
 
+_KNOWN_DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d")
+
+
 def _format_follow_up(date_text: Optional[str]) -> str:
     if not date_text:
         return "NA"
     cleaned = date_text.strip()
-    known_formats = ["%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d"]
-    for fmt in known_formats:
+    # Fast path for fixed-width DD-MM-YYYY, DD/MM/YYYY and YYYY-MM-DD inputs
+    if len(cleaned) == 10 and cleaned.isascii():
+        if cleaned[2] in "-/" and cleaned[5] == cleaned[2]:
+            day, month, year = cleaned[:2], cleaned[3:5], cleaned[6:]
+        elif cleaned[4] == "-" and cleaned[7] == "-":
+            year, month, day = cleaned[:4], cleaned[5:7], cleaned[8:]
+        else:
+            day = month = year = ""
+        if (day + month + year).isdigit():
+            try:
+                datetime(int(year), int(month), int(day))
+            except ValueError:
+                return cleaned
+            return f"{day}-{month}-{year}"
+    for fmt in _KNOWN_DATE_FORMATS:
         try:
             parsed = datetime.strptime(cleaned, fmt)
             return parsed.strftime("%d-%m-%Y")
@@ -109,11 +132,24 @@ def generate_lob_summary(
         follow_up_date: Optional date; various formats accepted; returned as DD-MM-YYYY.
         dp_sm_call: Override for DP/SM call; default is "NA".
     """
+    # Normalize before hitting the cache so bool/str stock values share a key
     stock_yes_no = _normalize_yes_no(stock_available)
-    offered_resolution = _choose_offered_resolution(issue_type, voc, stock_yes_no)
-    reason = _resolution_reason(offered_resolution, issue_type, voc)
+    return _generate_cached(issue_type, voc, stock_yes_no, follow_up_date, dp_sm_call)
+
+
+@lru_cache(maxsize=4096)
+def _generate_cached(
+    issue_type: str,
+    voc: str,
+    stock_yes_no: str,
+    follow_up_date: Optional[str],
+    dp_sm_call: Optional[str],
+) -> str:
+    keys = _detect_issue_keywords(f"{issue_type} {voc}")
+    offered_resolution = _choose_offered_resolution(keys, stock_yes_no)
+    reason = _resolution_reason(offered_resolution, keys)
 
-    summary_line = "Ordered by Mistake / By mistake ordered / Service No" if _detect_issue_keywords(issue_type + " " + voc) & {"ordered_by_mistake"} else issue_type.strip() or "Service No"
+    summary_line = "Ordered by Mistake / By mistake ordered / Service No" if "ordered_by_mistake" in keys else issue_type.strip() or "Service No"
 
     dp_sm_value = (dp_sm_call or "NA").strip() or "NA"
     follow_value = _format_follow_up(follow_up_date)